@@ -10,17 +10,42 @@ receiving a declarative YAML configuration file as input.
 from __future__ import annotations
 from dataclasses import dataclass, field, replace
 from abc import ABC, abstractmethod
+from collections import defaultdict, deque
 
 import argparse
+import io
 import json
 from jsonschema import validate, ValidationError
 import os
 import sys
-from typing import ClassVar, Generic, TypeVar, TypedDict
+from typing import ClassVar, Generic, TextIO, TypeVar
 import yaml
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader  # type: ignore[assignment]
+
 __version__ = "0.2.1"
 
+SCRIPT_HEADER = """\
+#!/usr/bin/env bash
+
+# -----------------------------------------------------------------------------
+# This script was automatically generated by distroscript.
+#
+# This file is produced from a YAML configuration and is intended to automate
+# the installation of software packages and dependencies for Linux systems.
+#
+# Any manual changes to this file will be lost if it is regenerated.
+# To modify the installation process, edit the YAML config and regenerate.
+#
+# For more information, visit: https://github.com/RaniAgus/distroscript
+# -----------------------------------------------------------------------------
+
+set -e
+"""
+
 def main(args: argparse.Namespace) -> None:
     """
     Usage: distroscript.py <config.yaml> --os <os_name> [--out <output.sh>]
@@ -31,8 +56,7 @@ def main(args: argparse.Namespace) -> None:
         sys.exit(1)
 
     try:
-        with open(args.config_path, 'r') as file:
-            config = yaml.safe_load(file)
+        config = load_config(args.config_path)
     except FileNotFoundError:
         print(f"Error: Config file not found: {args.config_path}")
         sys.exit(1)
@@ -47,59 +71,128 @@ def main(args: argparse.Namespace) -> None:
     schema_path = os.path.join(script_dir, 'schema.json')
     validate_config(config, schema_path)
 
+    merged = build_packages(config, platform)
+
+    if args.out:
+        with open(args.out, 'w') as outfile:
+            write_script(outfile, merged)
+    else:
+        write_script(sys.stdout, merged)
+        print()
+
+
+def generate(config_path: str, os_name: str) -> str:
+    """
+    Generate the installation script for a YAML config, returned as a string.
+
+    Programmatic entry point for callers such as the test runner; unlike the
+    CLI path it raises on an unknown OS or an invalid config instead of
+    printing and exiting.
+    """
+    platform = PLATFORMS.get(os_name)
+    if platform is None:
+        raise ValueError(f"Unsupported OS '{os_name}'. Supported OS: {', '.join(PLATFORMS.keys())}")
+
+    config = load_config(config_path)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    check_config(config, os.path.join(script_dir, 'schema.json'))
+
+    out = io.StringIO()
+    write_script(out, build_packages(config, platform))
+    return out.getvalue()
+
+
+def build_packages(config: dict, platform: Platform) -> list[Package]:
     packages = load_packages(config, platform)
     resolved = resolve_packages(packages)
-    merged = merge_packages([
-        pkg.calculate_transitive_dependencies(resolved)
+    index = index_packages(resolved)
+    return merge_packages([
+        pkg.calculate_transitive_dependencies(index)
         for pkg in resolved
     ])
 
-    lines = [
-        "#!/usr/bin/env bash",
-        "",
-        "# -----------------------------------------------------------------------------",
-        "# This script was automatically generated by distroscript.",
-        "#",
-        "# This file is produced from a YAML configuration and is intended to automate",
-        "# the installation of software packages and dependencies for Linux systems.",
-        "#",
-        "# Any manual changes to this file will be lost if it is regenerated.",
-        "# To modify the installation process, edit the YAML config and regenerate.",
-        "#",
-        "# For more information, visit: https://github.com/RaniAgus/distroscript",
-        "# -----------------------------------------------------------------------------",
-        "",
-        "set -e",
-        "",
-        *(pkg.print() for pkg in merged)
-    ]
 
-    script_content = "\n".join(lines).strip() + "\n"
+def write_script(out: TextIO, packages: list[Package]) -> None:
+    out.write(SCRIPT_HEADER)
+    for pkg in packages:
+        out.write('\n')
+        out.write(pkg.print())
+
 
-    if args.out:
-        with open(args.out, 'w') as outfile:
-            outfile.write(script_content)
-    else:
-        print(script_content)
+_CONFIG_CACHE: dict[tuple[str, float, int], dict] = {}
+
+def load_config(config_path: str) -> dict:
+    """
+    Parse a YAML config file, memoizing by (path, mtime, size) so programmatic
+    callers generating scripts for several OSes only pay for parsing once.
+    """
+    path = os.path.abspath(config_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+
+    if key not in _CONFIG_CACHE:
+        _CONFIG_CACHE[key] = read_config(path, stat.st_mtime)
+
+    return _CONFIG_CACHE[key]
+
+
+def read_config(path: str, mtime: float) -> dict:
+    """
+    Parse a YAML config, reusing a sidecar <config>.cache.json across process
+    invocations. The cache is rebuilt whenever it is older than the YAML file,
+    unreadable, or not representable as JSON.
+    """
+    cache_path = path + '.cache.json'
+    try:
+        if os.path.getmtime(cache_path) >= mtime:
+            with open(cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    with open(path, 'r') as file:
+        config = yaml.load(file.read(), Loader=_YamlLoader)
+
+    try:
+        with open(cache_path + '.tmp', 'w') as cache_file:
+            json.dump(config, cache_file)
+        os.replace(cache_path + '.tmp', cache_path)
+    except (OSError, TypeError):
+        pass
+
+    return config
 
 
 def validate_config(config: dict, schema_path: str) -> None:
+    try:
+        check_config(config, schema_path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: Validation error: {e}")
+        sys.exit(1)
+
+
+def check_config(config: dict, schema_path: str) -> None:
+    """
+    Validate a config against the JSON schema, raising ValueError with a
+    readable message on failure instead of printing and exiting.
+    """
     try:
         with open(schema_path, 'r') as schema_file:
             schema = json.load(schema_file)
 
         validate(instance=config, schema=schema)
     except ValidationError as e:
-        print(f"Error: Configuration validation failed:")
-        print(f"  Path: {' -> '.join(str(p) for p in e.path) if e.path else 'root'}")
-        print(f"  Message: {e.message}")
-        sys.exit(1)
+        raise ValueError(
+            "Configuration validation failed:\n"
+            f"  Path: {' -> '.join(str(p) for p in e.path) if e.path else 'root'}\n"
+            f"  Message: {e.message}"
+        ) from e
     except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON schema file: {e}")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error: Validation error: {e}")
-        sys.exit(1)
+        raise ValueError(f"Invalid JSON schema file: {e}") from e
 
 
 def load_packages(config: dict, platform: Platform) -> dict[str, list[Package]]:
@@ -112,6 +205,13 @@ def load_packages(config: dict, platform: Platform) -> dict[str, list[Package]]:
 
 
 def load_package_list(name: str, config: list[dict], platform: Platform) -> list[Package]:
+    """
+    Return the packages for the first alternative that resolves on this platform.
+
+    Alternatives listed after the winning one are never constructed, and
+    blacklisted ones are rejected before any pre/post-install parsing happens,
+    so only the selected variant ever pays full construction cost.
+    """
     for item in config:
         packages = Package.create(
             name,
@@ -136,16 +236,27 @@ def resolve_packages(packages: dict[str, list[Package]]) -> list[Package]:
     ]
 
 
+def index_packages(packages: list[Package]) -> dict[str, Package]:
+    return {
+        satisfied: pkg
+        for pkg in packages
+        for satisfied in pkg.satisfies
+    }
+
+
 def merge_packages(packages: list[Package]) -> list[Package]:
     merged: list[Package] = []
+    candidates: dict[tuple[type[Package], tuple[str, ...]], list[int]] = defaultdict(list)
 
     for pkg in packages:
-        for i, existing in enumerate(merged):
-            merged_pkg = existing.merge(pkg)
+        key = (type(pkg), pkg.flags)
+        for i in candidates[key]:
+            merged_pkg = merged[i].merge(pkg)
             if merged_pkg is not None:
                 merged[i] = merged_pkg
                 break
         else:
+            candidates[key].append(len(merged))
             merged.append(pkg)
 
     return merged
@@ -153,10 +264,10 @@ def merge_packages(packages: list[Package]) -> list[Package]:
 
 ## Platforms ###
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Platform(ABC):
-    preinstalled_packages: tuple[str, ...] = field(default_factory=tuple)
-    blacklisted_types: tuple[str, ...] = field(default_factory=tuple)
+    preinstalled_packages: frozenset[str] = field(default_factory=frozenset)
+    blacklisted_types: frozenset[str] = field(default_factory=frozenset)
 
     def allows(self, package_type: str) -> bool:
         return package_type not in self.blacklisted_types
@@ -167,34 +278,36 @@ class Platform(ABC):
 
 PLATFORMS = {
     'ubuntu': Platform(
-        preinstalled_packages=('bash', 'apt', 'deb', 'snapd'),
-        blacklisted_types=('dnf',),
+        preinstalled_packages=frozenset({'bash', 'apt', 'deb', 'snapd'}),
+        blacklisted_types=frozenset({'dnf'}),
     ),
     'popos': Platform(
-        preinstalled_packages=('bash', 'apt', 'deb', 'flatpak'),
-        blacklisted_types=('dnf',),
+        preinstalled_packages=frozenset({'bash', 'apt', 'deb', 'flatpak'}),
+        blacklisted_types=frozenset({'dnf'}),
     ),
     'mint': Platform(
-        preinstalled_packages=('bash', 'apt', 'deb'),
-        blacklisted_types=('dnf',),
+        preinstalled_packages=frozenset({'bash', 'apt', 'deb'}),
+        blacklisted_types=frozenset({'dnf'}),
     ),
     'fedora': Platform(
-        preinstalled_packages=('bash', 'dnf', 'flatpak'),
-        blacklisted_types=('apt', 'deb'),
+        preinstalled_packages=frozenset({'bash', 'dnf', 'flatpak'}),
+        blacklisted_types=frozenset({'apt', 'deb'}),
     ),
 }
 
 
 ### Package Implementations ###
 
-T = TypeVar('T', bound='Package')
+_DNF_INSTALL = 'dnf install -y '
+_APT_INSTALL = 'apt-get install -y '
+_SNAP_INSTALL = 'snap install '
+_FLATPAK_INSTALL = 'flatpak install -y '
+_PIP_INSTALL = 'pip install -U '
 
+T = TypeVar('T', bound='Package')
 
-class MimeType(TypedDict):
-    type: str
-    default: bool
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Package(ABC, Generic[T]):
     factories: ClassVar[dict[str, type[Package]]] = {}
 
@@ -205,12 +318,19 @@ class Package(ABC, Generic[T]):
     dependencies: tuple[str, ...] = field(default_factory=tuple)
 
     def __init_subclass__(cls, *, type: str | None = None, **kwargs):
-        super().__init_subclass__(**kwargs)
+        # Two-arg super: dataclass(slots=True) re-creates classes, which breaks
+        # the zero-arg form's __class__ cell.
+        super(Package, cls).__init_subclass__(**kwargs)
         if type is not None:
             cls.factories[type] = cls
 
     @classmethod
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
+        """
+        Construct the packages for one YAML alternative, or [] if it does not
+        apply. The target platform is known up front, so alternatives whose
+        type is blacklisted for it are dropped here before any construction.
+        """
         if 'type' not in item:
             return []
 
@@ -222,17 +342,11 @@ class Package(ABC, Generic[T]):
 
 
     def print(self) -> str:
-        parts = []
-
-        for cmd in self.pre_install:
-            parts.append(cmd.print())
-
-        parts.append("".join(self.print_package()).strip())
-
-        for cmd in self.post_install:
-            parts.append(cmd.print())
-
-        return "\n\n".join(parts) + "\n"
+        return "\n\n".join([
+            *(cmd.print() for cmd in self.pre_install),
+            "".join(self.print_package()).strip(),
+            *(cmd.print() for cmd in self.post_install),
+        ]) + "\n"
 
     @abstractmethod
     def print_package(self) -> list[str]:
@@ -259,22 +373,25 @@ class Package(ABC, Generic[T]):
     def apply_merge(self: T, other: T) -> T | None:
         return None
 
-    def calculate_transitive_dependencies(self, packages: list[Package]) -> Package:
-        return replace(self, dependencies=tuple(sorted(self.all_dependencies(packages))))
-
-    def all_dependencies(self, packages: list[Package]) -> set[str]:
-        dependencies = set(self.dependencies)
-        dependencies.update(
-            transitive_dep
-            for dep in self.dependencies
-            for pkg in packages
-            if dep in pkg.satisfies
-            for transitive_dep in pkg.all_dependencies(packages)
-        )
+    def calculate_transitive_dependencies(self, index: dict[str, Package]) -> Package:
+        return replace(self, dependencies=tuple(sorted(self.all_dependencies(index))))
+
+    def all_dependencies(self, index: dict[str, Package]) -> set[str]:
+        dependencies: set[str] = set()
+        pending = deque(self.dependencies)
+
+        while pending:
+            dep = pending.popleft()
+            if dep in dependencies:
+                continue
+            dependencies.add(dep)
+            if dep in index:
+                pending.extend(index[dep].dependencies)
+
         return dependencies
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DnfPackage(Package, type='dnf'):
     packages: tuple[str, ...] = field(default_factory=tuple)
     sudo: bool = field(default=True)
@@ -283,24 +400,23 @@ class DnfPackage(Package, type='dnf'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', True)
 
         if not platform.preinstalls('dnf'):
             deps['dnf'] = [UndefinedPackage(name='dnf')]
 
-        if 'repofile' in item:
-            repo_file = item['repofile']
+        if (repo_file := item.get('repofile')) is not None:
             pre_install.append(ShellCommand(
                 command=f"sudo dnf config-manager addrepo --from-repofile={repo_file} --overwrite\n"
             ))
 
-        if 'repo' in item:
-            flags.append(f"--repo {item['repo']}")
+        if (repo := item.get('repo')) is not None:
+            flags.append(f"--repo {repo}")
 
-        if 'copr' in item:
+        if (copr := item.get('copr')) is not None:
             pre_install.append(ShellCommand(
-                command=f"sudo dnf copr enable {item['copr']} -y\n"
+                command=f"sudo dnf copr enable {copr} -y\n"
             ))
 
         return [
@@ -317,21 +433,12 @@ class DnfPackage(Package, type='dnf'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-        if self.sudo:
-            parts.append('sudo ')
-        parts.append('dnf install -y ')
-
-        for pkg in self.packages:
-            parts.append('"')
-            parts.append(pkg)
-            parts.append('" ')
-
-        for flag in self.flags:
-            parts.append(flag)
-            parts.append(" ")
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        return [
+            sudo + _DNF_INSTALL,
+            *(f'"{pkg}" ' for pkg in self.packages),
+            *(f'{flag} ' for flag in self.flags),
+        ]
 
     def apply_merge(self, other: 'DnfPackage') -> 'DnfPackage' | None:
         merged_packages = tuple(sorted(set(self.packages) | set(other.packages)))
@@ -346,7 +453,7 @@ class DnfPackage(Package, type='dnf'):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AptPackage(Package, type='apt'):
     packages: tuple[str, ...] = field(default_factory=tuple)
     sudo: bool = field(default=True)
@@ -355,7 +462,7 @@ class AptPackage(Package, type='apt'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', True)
 
         if not platform.preinstalls('apt'):
@@ -375,21 +482,12 @@ class AptPackage(Package, type='apt'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-        if self.sudo:
-            parts.append('sudo ')
-        parts.append('apt-get install -y ')
-
-        for pkg in self.packages:
-            parts.append('"')
-            parts.append(pkg)
-            parts.append('" ')
-
-        for flag in self.flags:
-            parts.append(flag)
-            parts.append(' ')
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        return [
+            sudo + _APT_INSTALL,
+            *(f'"{pkg}" ' for pkg in self.packages),
+            *(f'{flag} ' for flag in self.flags),
+        ]
 
     def apply_merge(self, other: 'AptPackage') -> 'AptPackage' | None:
         merged_packages = tuple(sorted(set(self.packages) | set(other.packages)))
@@ -404,7 +502,7 @@ class AptPackage(Package, type='apt'):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DebPackage(Package, type='deb'):
     packages: tuple[str, ...] = field(default_factory=tuple)
     sudo: bool = field(default=True)
@@ -413,7 +511,7 @@ class DebPackage(Package, type='deb'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', True)
 
         if not platform.preinstalls('deb'):
@@ -433,28 +531,18 @@ class DebPackage(Package, type='deb'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-
-        for pkg in self.packages:
-            parts.append('TMP_FILE=$(mktemp)\n')
-            parts.append('wget -O "$TMP_FILE" "')
-            parts.append(pkg)
-            parts.append('"\n')
-            if self.sudo:
-                parts.append('sudo ')
-            parts.append('apt-get install -y "$TMP_FILE" ')
-
-            for flag in self.flags:
-                parts.append(flag)
-                parts.append(" ")
-
-            parts.append("\n")
-            parts.append('rm "$TMP_FILE"\n')
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        flags = ''.join(f'{flag} ' for flag in self.flags)
+        return [
+            f'TMP_FILE=$(mktemp)\n'
+            f'wget -O "$TMP_FILE" "{pkg}"\n'
+            f'{sudo}apt-get install -y "$TMP_FILE" {flags}\n'
+            f'rm "$TMP_FILE"\n'
+            for pkg in self.packages
+        ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SnapPackage(Package, type='snapd'):
     packages: tuple[str, ...] = field(default_factory=tuple)
     sudo: bool = field(default=True)
@@ -463,13 +551,13 @@ class SnapPackage(Package, type='snapd'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', True)
 
         if not platform.preinstalls('snapd'):
             deps['snapd'] = [UndefinedPackage(name='snapd')]
 
-        if 'classic' in item and item['classic']:
+        if item.get('classic'):
             flags.append('--classic')
 
         return [
@@ -486,21 +574,12 @@ class SnapPackage(Package, type='snapd'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-        if self.sudo:
-            parts.append('sudo ')
-        parts.append('snap install ')
-
-        for pkg in self.packages:
-            parts.append('"')
-            parts.append(pkg)
-            parts.append('" ')
-
-        for flag in self.flags:
-            parts.append(flag)
-            parts.append(' ')
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        return [
+            sudo + _SNAP_INSTALL,
+            *(f'"{pkg}" ' for pkg in self.packages),
+            *(f'{flag} ' for flag in self.flags),
+        ]
 
     def apply_merge(self, other: 'SnapPackage') -> 'SnapPackage' | None:
         if self.sudo != other.sudo:
@@ -518,7 +597,7 @@ class SnapPackage(Package, type='snapd'):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FlatpakPackage(Package, type='flatpak'):
     remote: str = field(default="flathub")
     packages: tuple[str, ...] = field(default_factory=tuple)
@@ -528,15 +607,13 @@ class FlatpakPackage(Package, type='flatpak'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', False)
 
         if not platform.preinstalls('flatpak'):
             deps['flatpak'] = [UndefinedPackage(name='flatpak')]
 
-        remote = "flathub"
-        if 'remote' in item:
-            remote = item['remote']
+        remote = item.get('remote', "flathub")
 
         return [
             *(pkg for pkgs in deps.values() for pkg in pkgs),
@@ -553,23 +630,12 @@ class FlatpakPackage(Package, type='flatpak'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-        if self.sudo:
-            parts.append('sudo ')
-        parts.append('flatpak install -y ')
-        parts.append(self.remote)
-        parts.append(' ')
-
-        for pkg in self.packages:
-            parts.append('"')
-            parts.append(pkg)
-            parts.append('" ')
-
-        for flag in self.flags:
-            parts.append(flag)
-            parts.append(" ")
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        return [
+            sudo + _FLATPAK_INSTALL + self.remote + ' ',
+            *(f'"{pkg}" ' for pkg in self.packages),
+            *(f'{flag} ' for flag in self.flags),
+        ]
 
     def apply_merge(self, other: 'FlatpakPackage') -> 'FlatpakPackage' | None:
         if self.sudo != other.sudo:
@@ -588,7 +654,7 @@ class FlatpakPackage(Package, type='flatpak'):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PipPackage(Package, type='pip'):
     packages: tuple[str, ...] = field(default_factory=tuple)
     sudo: bool = field(default=False)
@@ -597,7 +663,7 @@ class PipPackage(Package, type='pip'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         packages = create_packages_list(item, name)
         pre_install, post_install, deps = create_common_package_fields(name, item, platform)
-        flags = item.get('flags', [])
+        flags = list(item.get('flags', ()))
         sudo = item.get('sudo', False)
 
         if not platform.preinstalls('pip'):
@@ -617,20 +683,12 @@ class PipPackage(Package, type='pip'):
         ]
 
     def print_package(self) -> list[str]:
-        parts = []
-        if self.sudo:
-            parts.append('sudo ')
-        parts.append("pip install -U ")
-        for pkg in self.packages:
-            parts.append('"')
-            parts.append(pkg)
-            parts.append('" ')
-
-        for flag in self.flags:
-            parts.append(flag)
-            parts.append(' ')
-
-        return parts
+        sudo = 'sudo ' if self.sudo else ''
+        return [
+            sudo + _PIP_INSTALL,
+            *(f'"{pkg}" ' for pkg in self.packages),
+            *(f'{flag} ' for flag in self.flags),
+        ]
 
     def apply_merge(self, other: 'PipPackage') -> 'PipPackage' | None:
         if self.sudo != other.sudo:
@@ -648,7 +706,7 @@ class PipPackage(Package, type='pip'):
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TarPackage(Package, type='tar'):
     url: str = field(default="")
     sudo: bool = field(default=False)
@@ -696,7 +754,7 @@ class TarPackage(Package, type='tar'):
         return parts
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ZipPackage(Package, type='zip'):
     url: str = field(default="")
     sudo: bool = field(default=False)
@@ -744,7 +802,7 @@ class ZipPackage(Package, type='zip'):
         return lines
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GitHubPackage(Package, type='github'):
     repository: str = field(default="")
     install: str = field(default="")
@@ -774,26 +832,18 @@ class GitHubPackage(Package, type='github'):
         ]
 
     def print_package(self) -> list[str]:
-        lines = []
-        lines.append('TMP_DIR=$(mktemp -d)\n')
-        lines.append('git clone https://github.com/')
-        lines.append(self.repository)
-        lines.append('.git "$TMP_DIR"\n')
-        lines.append('(\n')
-        lines.append('  cd "$TMP_DIR"\n')
-
-        for line in self.install.splitlines():
-            lines.append('  ')
-            lines.append(line)
-            lines.append('\n')
-
-        lines.append(')\n')
-        lines.append('rm -rf "$TMP_DIR"\n')
-
-        return lines
+        return [
+            'TMP_DIR=$(mktemp -d)\n',
+            f'git clone https://github.com/{self.repository}.git "$TMP_DIR"\n',
+            '(\n',
+            '  cd "$TMP_DIR"\n',
+            *(f'  {line}\n' for line in self.install.splitlines()),
+            ')\n',
+            'rm -rf "$TMP_DIR"\n',
+        ]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FilePackage(Package, type='file'):
     url: str = field(default="")
     destination: str = field(default="")
@@ -858,7 +908,7 @@ class FilePackage(Package, type='file'):
         return parts
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AppImagePackage(Package, type='appimage'):
     url: str = field(default="")
     name: str = field(default="")
@@ -868,20 +918,17 @@ class AppImagePackage(Package, type='appimage'):
     def create(cls, name: str, item: dict, platform: Platform) -> list[Package]:
         url = item.get('url')
         icon_name = item.get('icon_name')
-        mime_types: list[MimeType] = []
+        mime_type_names: list[str] = []
+        mime_type_defaults: list[bool] = []
         for mime_type in item.get('mime_types', []):
             if isinstance(mime_type, str):
-                mime_types.append({
-                    'type': mime_type,
-                    'default': mime_type.startswith('x-scheme-handler/'),
-                })
+                mime_type_name = mime_type
+                mime_type_default = mime_type.startswith('x-scheme-handler/')
             else:
                 mime_type_name = mime_type.get('type')
-                mime_types.append({
-                    'type': mime_type_name,
-                    'default': mime_type.get('default', mime_type_name.startswith('x-scheme-handler/')),
-                })
-        mime_type_names = [mime_type['type'] for mime_type in mime_types]
+                mime_type_default = mime_type.get('default', mime_type_name.startswith('x-scheme-handler/'))
+            mime_type_names.append(mime_type_name)
+            mime_type_defaults.append(mime_type_default)
 
         if not url:
             raise RuntimeError(f"AppImagePackage requires 'url' field.")
@@ -923,11 +970,11 @@ class AppImagePackage(Package, type='appimage'):
             )
         )
 
-        for mime_type in mime_types:
-            if mime_type.get('default', False):
+        for mime_type_name, mime_type_default in zip(mime_type_names, mime_type_defaults):
+            if mime_type_default:
                 post_install.append(
                     ShellCommand(
-                        command=f'xdg-mime default {desktop_file} {mime_type["type"]}'
+                        command=f'xdg-mime default {desktop_file} {mime_type_name}'
                     )
                 )
 
@@ -982,7 +1029,7 @@ class AppImagePackage(Package, type='appimage'):
         return parts
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ShellPackage(Package, type='shell'):
     shell: str = field(default="bash")
     script: str | None = field(default=None)
@@ -1037,7 +1084,7 @@ class ShellPackage(Package, type='shell'):
         return parts
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class UndefinedPackage(Package):
     name: str = field(default="undefined")
 
@@ -1054,7 +1101,7 @@ class UndefinedPackage(Package):
             for pkg in all_packages.get(self.name, [])
             if pkg != self
             for resolved in pkg.resolve(all_packages)
-        ] if self.name in all_packages else super().resolve(all_packages)
+        ] if self.name in all_packages else super(UndefinedPackage, self).resolve(all_packages)
 
 
 ## Package Helpers ###
@@ -1078,10 +1125,10 @@ def create_install_commands(commands: list | dict | str) -> list[Command]:
     return [
         cmd
         for command in (commands if isinstance(commands, list) else [commands])
-        for cmd in [Command.create(
-            command if isinstance(command, dict)
-            else {'type': 'shell', 'command': command}
-        )]
+        for cmd in [
+            Command.create(command) if isinstance(command, dict)
+            else ShellCommand(command=command)
+        ]
         if cmd is not None
     ]
 
@@ -1105,12 +1152,12 @@ def script_escape(script: str) -> str:
 
 ## Command Implementations ###
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Command:
     factories: ClassVar[dict[str, type[Command]]] = {}
 
     def __init_subclass__(cls, *, type: str | None = None, **kwargs):
-        super().__init_subclass__(**kwargs)
+        super(Command, cls).__init_subclass__(**kwargs)
         if type is not None:
             cls.factories[type] = cls
 
@@ -1124,7 +1171,7 @@ class Command:
         pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ShellCommand(Command, type='shell'):
     command: str = field(default="")
 
@@ -1136,7 +1183,7 @@ class ShellCommand(Command, type='shell'):
         return self.command.strip()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TeeCommand(Command, type='tee'):
     content: str = field(default="")
     destination: str = field(default="")
@@ -1155,29 +1202,10 @@ class TeeCommand(Command, type='tee'):
         )
 
     def print(self) -> str:
-        parts = []
-
-        if self.mkdir:
-            parts.append('mkdir -p "$(dirname "')
-            parts.append(self.destination)
-            parts.append('")"\n')
-
-        if self.sudo:
-            parts.append('sudo ')
-
-        parts.append('tee ')
-
-        if self.append:
-            parts.append('-a ')
-
-        parts.append('"')
-        parts.append(self.destination)
-        parts.append('"')
-        parts.append(" <<'EOF'\n")
-        parts.append(self.content)
-        parts.append("EOF")
-
-        return "".join(parts).strip()
+        mkdir = f'mkdir -p "$(dirname "{self.destination}")"\n' if self.mkdir else ''
+        sudo = 'sudo ' if self.sudo else ''
+        append = '-a ' if self.append else ''
+        return f'{mkdir}{sudo}tee {append}"{self.destination}" <<\'EOF\'\n{self.content}EOF'.strip()
 
 
 ## Entry Point ###
@@ -1185,12 +1213,49 @@ class TeeCommand(Command, type='tee'):
 
 def _cli() -> None:
     args_parser = argparse.ArgumentParser(description="Generate installation scripts from YAML config.")
-    args_parser.add_argument("config_path", help="Path to the YAML configuration file.")
-    args_parser.add_argument("--os", required=True, help="Target operating system (e.g., 'ubuntu', 'fedora').")
+    args_parser.add_argument("config_path", nargs='?', help="Path to the YAML configuration file.")
+    args_parser.add_argument("--os", help="Target operating system (e.g., 'ubuntu', 'fedora').")
     args_parser.add_argument("--out", help="Output shell script file path (optional, defaults to stdout).")
+    args_parser.add_argument("--batch", action='store_true',
+                             help="Read '<config_path>\\t<os>' pairs from stdin and emit each script "
+                                  "followed by an '---END <config_path> <os> <status>---' sentinel line.")
     args = args_parser.parse_args(sys.argv[1:])
+
+    if args.batch:
+        _batch()
+        return
+
+    if args.config_path is None or args.os is None:
+        args_parser.error("config_path and --os are required unless --batch is given")
+
     main(args)
 
 
+def _batch() -> None:
+    """
+    Serve many generation requests from a single interpreter, so callers such
+    as the test runner do not pay Python startup once per (config, os) pair.
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        config_path, sep, os_name = line.partition('\t')
+        if not sep:
+            print(f"Error: Invalid batch line (expected '<config_path>\\t<os>'): {line}")
+            print(f"---END {config_path} ? error---", flush=True)
+            continue
+
+        args = argparse.Namespace(config_path=config_path, os=os_name, out=None)
+        try:
+            main(args)
+            status = 'ok'
+        except SystemExit:
+            status = 'error'
+
+        print(f"---END {config_path} {os_name} {status}---", flush=True)
+
+
 if __name__ == "__main__":
     _cli()
@@ -2,23 +2,136 @@
 """
 Test script to run each input YAML for Fedora and Ubuntu,
 generate the install script, and compare to expected output.
-If different, show git diff.
+If different, show a unified diff.
 """
 
+import difflib
+import hashlib
+import json
+import multiprocessing
 import os
-import glob
-import subprocess
-import tempfile
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from distroscript import generate
 
-SCRIPT_GENERATOR = 'src/distroscript.py'
 OS_TYPES = ['fedora', 'ubuntu']
 
+SCRIPT_GENERATOR = 'src/distroscript.py'
+SCHEMA_FILE = 'src/schema.json'
+TEST_RUNNER = 'tests/run_tests.py'
+
+# Opt-in (DISTROSCRIPT_TEST_CACHE=1): skip the suite when nothing changed
+# since the last all-green run
+CACHE_ENV = 'DISTROSCRIPT_TEST_CACHE'
+LAST_RUN_FILE = 'tests/.last_run.json'
+
 # ANSI color codes
 BOLD = '\033[1m'
 GREEN = '\033[92m'
 RED = '\033[91m'
 RESET = '\033[0m'
 
+# Result-line templates, specialized once instead of rebuilt per case
+PASS_FMT = (GREEN + '[PASS] {} for {}' + RESET).format
+FAIL_FMT = (RED + '[FAIL] {} for {}' + RESET).format
+ERROR_FMT = (RED + '[ERROR] {} for {} - generator failed' + RESET).format
+
+def collect_cases(inputs_dir, outputs_dir):
+    # One directory scan per OS over the expected outputs, indexed by (number, os_type)
+    expected_index = {}
+    for os_type in OS_TYPES:
+        with os.scandir(os.path.join(outputs_dir, os_type)) as entries:
+            for entry in entries:
+                if entry.name.endswith('.sh'):
+                    expected_index[(entry.name.split('-')[0], os_type)] = entry.path  # Assume only one
+
+    with os.scandir(inputs_dir) as entries:
+        input_files = sorted(entry.path for entry in entries if entry.name.endswith('.yml'))
+
+    cases = []
+    for input_file in input_files:
+        base = os.path.basename(input_file)
+        number = base.split('-')[0]
+
+        for os_type in OS_TYPES:
+            expected_file = expected_index.get((number, os_type))
+            if expected_file is None:
+                print(f"[SKIP] No expected file for {input_file} on {os_type}")
+                continue
+            cases.append((input_file, base, os_type, expected_file))
+
+    return cases
+
+def generate_all(cases):
+    """Generate every case in-process, without spawning a generator subprocess."""
+    results = []
+    for input_file, _, os_type, _ in cases:
+        try:
+            results.append((generate(input_file, os_type), 'ok'))
+        except (Exception, SystemExit) as e:
+            results.append((f"{type(e).__name__}: {e}", 'error'))
+    return results
+
+def generate_parallel(cases):
+    """Split the cases over a pool of workers that call generate() in-process."""
+    workers = min(os.cpu_count() or 1, len(cases))
+    if workers <= 1:
+        return generate_all(cases)
+
+    # Stripe cases round-robin in descending input-size order so every worker
+    # gets a similar mix of big and small inputs and no chunk becomes a
+    # straggler. Results are mapped back to the original case order below, so
+    # reporting stays stable.
+    order = sorted(range(len(cases)), key=lambda i: -os.path.getsize(cases[i][0]))
+    chunks = [[cases[i] for i in order[w::workers]] for w in range(workers)]
+
+    # Prefer fork so workers inherit the already-imported distroscript module
+    # instead of re-importing it per worker under spawn/forkserver.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context('fork')
+    else:
+        mp_context = multiprocessing.get_context()
+
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=mp_context) as pool:
+        chunk_results = list(pool.map(generate_all, chunks))
+
+    results = [None] * len(cases)
+    for w, chunk_result in enumerate(chunk_results):
+        for i, result in zip(order[w::workers], chunk_result):
+            results[i] = result
+    return results
+
+def render_diff(expected_file, expected_script, generated_script):
+    """Build a colorized unified diff between expected and generated scripts."""
+    diff = difflib.unified_diff(
+        expected_script.splitlines(),
+        generated_script.splitlines(),
+        fromfile=expected_file,
+        tofile='<generated>',
+        lineterm='',
+    )
+    return '\n'.join(
+        f"{RED}{line}{RESET}" if line.startswith('-') else
+        f"{GREEN}{line}{RESET}" if line.startswith('+') else
+        line
+        for line in diff
+    )
+
+def suite_hash(cases):
+    """Hash the generator source, schema and runner plus every input and expected file."""
+    files = {SCRIPT_GENERATOR, SCHEMA_FILE, TEST_RUNNER}
+    for input_file, _, _, expected_file in cases:
+        files.add(input_file)
+        files.add(expected_file)
+
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
 def main():
     inputs_dir = 'tests/inputs'
     outputs_dir = 'tests/outputs'
@@ -28,69 +141,44 @@ def main():
 
     pass_count = 0
     fail_count = 0
+    report = []
 
-    for input_file in sorted(glob.glob(os.path.join(inputs_dir, '*.yml'))):
-        base = os.path.basename(input_file)
-        number = base.split('-')[0]
+    cases = collect_cases(inputs_dir, outputs_dir)
 
-        for os_type in OS_TYPES:
-            expected_pattern = os.path.join(outputs_dir, os_type, f"{number}-*.sh")
-            expected_files = glob.glob(expected_pattern)
-            if not expected_files:
-                print(f"[SKIP] No expected file for {input_file} on {os_type}")
-                continue
-            expected_file = expected_files[0]  # Assume only one
-
-            try:
-                # Run the generator
-                result = subprocess.run(
-                    ['python3', SCRIPT_GENERATOR, input_file, '--os', os_type],
-                    capture_output=True, text=True, check=True
-                )
-                generated_script = result.stdout[:-1] if result.stdout.endswith('\n') else result.stdout
-            except subprocess.CalledProcessError as e:
-                fail_count += 1
-                print(f"{RED}[ERROR] {base} for {os_type} - generator failed{RESET}")
-                print(f"Command: {' '.join(e.cmd)}")
-                print(f"Return code: {e.returncode}")
-                print(f"Stdout: {e.stdout}")
-                print(f"Stderr: {e.stderr}")
-                continue  # Skip the diff part
-
-            # Write to temp file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False) as temp:
-                temp.write(generated_script)
-                temp_path = temp.name
-
-            try:
-                # Run git diff with colors
-                diff_result = subprocess.run(
-                    ['git', 'diff', '--no-index', '--color=always', expected_file, temp_path],
-                    capture_output=True, text=True
-                )
-                if diff_result.returncode == 0:
-                    pass_count += 1
-                    print(f"{GREEN}[PASS] {base} for {os_type}{RESET}")
-                else:
-                    fail_count += 1
-                    print(f"{RED}[FAIL] {base} for {os_type}{RESET}")
-                    print(diff_result.stdout)
-            except subprocess.CalledProcessError as e:
-                # If git diff fails, show the error
-                fail_count += 1
-                print(f"{RED}[ERROR] {base} for {os_type} - git diff failed{RESET}")
-                print(f"Error: {e}")
-                print(f"Stdout: {e.stdout}")
-                print(f"Stderr: {e.stderr}")
-            except Exception as e:
-                # Other exceptions
-                fail_count += 1
-                print(f"{RED}[ERROR] {base} for {os_type} - unexpected error{RESET}")
-                print(f"Error: {e}")
-            finally:
-                os.unlink(temp_path)
-
-    print(f"\n{BOLD}Results:{RESET} {GREEN}{pass_count} passed{RESET}, {RED}{fail_count} failed{RESET}")
+    cache_enabled = os.environ.get(CACHE_ENV) == '1'
+    current_hash = suite_hash(cases) if cache_enabled else None
+    if cache_enabled:
+        try:
+            last_run = json.loads(Path(LAST_RUN_FILE).read_text())
+            if last_run.get('hash') == current_hash and last_run.get('fail') == 0:
+                print(f"{BOLD}Results:{RESET} {GREEN}{last_run['pass']} passed{RESET} (cached, nothing changed)")
+                return
+        except (OSError, ValueError):
+            pass
+    results = generate_parallel(cases)
+
+    for (input_file, base, os_type, expected_file), (generated_script, status) in zip(cases, results):
+        if status != 'ok':
+            fail_count += 1
+            report.append(ERROR_FMT(base, os_type))
+            report.append(generated_script)
+            continue
+
+        expected_script = Path(expected_file).read_text()
+
+        if generated_script == expected_script:
+            pass_count += 1
+            report.append(PASS_FMT(base, os_type))
+        else:
+            fail_count += 1
+            report.append(FAIL_FMT(base, os_type))
+            report.append(render_diff(expected_file, expected_script, generated_script))
+
+    report.append(f"\n{BOLD}Results:{RESET} {GREEN}{pass_count} passed{RESET}, {RED}{fail_count} failed{RESET}")
+    sys.stdout.write('\n'.join(report) + '\n')
+
+    if cache_enabled and fail_count == 0:
+        Path(LAST_RUN_FILE).write_text(json.dumps({'hash': current_hash, 'pass': pass_count, 'fail': 0}))
 
     if fail_count > 0:
         exit(1)